@@ -1,4 +1,5 @@
 import re
+from functools import lru_cache
 from typing import Optional
 
 try:
@@ -6,16 +7,16 @@ try:
 except Exception:  # pragma: no cover
     Normalizer = None  # type: ignore
 
-try:
-    from persiantools import digits
-except Exception:  # pragma: no cover
-    digits = None  # type: ignore
-
 # Optional Arabic shaping and bidi display
 try:
-    import arabic_reshaper  # type: ignore
+    from arabic_reshaper import ArabicReshaper  # type: ignore
+    # Build the reshaper (config + ligature tables) once instead of per call
+    _RESHAPER = ArabicReshaper(configuration={
+        "delete_harakat": True,
+        "support_ligatures": True,
+    })
 except Exception:  # pragma: no cover
-    arabic_reshaper = None  # type: ignore
+    _RESHAPER = None  # type: ignore
 
 try:
     from bidi.algorithm import get_display  # type: ignore
@@ -25,6 +26,23 @@ except Exception:  # pragma: no cover
 
 _PERSIAN_REGEX = re.compile(r"[\u0600-\u06FF]")
 
+# Punctuation spacing and whitespace runs, fixed in a single pass. Single
+# plain spaces are already normal and deliberately not matched, so the
+# replacement callback is skipped for the ordinary gaps between words
+# (punctuation is still matched, even when already correctly spaced).
+_PUNCT_WS_RE = re.compile(r"\s*([,،؛!?.:])\s*|\s{2,}|[^\S ]")
+
+# Single-pass character fixups: Arabic letter forms to Persian, tatweel removal
+_PERSIAN_LETTERS = str.maketrans({
+    0x064A: 0x06CC,  # ي -> ی
+    0x0643: 0x06A9,  # ك -> ک
+    0x06C0: 0x0629,  # ۀ -> ة (rare; keep as-is if needed)
+    0x0640: None,    # tatweel
+})
+
+# ...plus English digits to Persian digits
+_PERSIAN_MULTI = {**_PERSIAN_LETTERS, **{0x0030 + i: 0x06F0 + i for i in range(10)}}
+
 _normalizer: Optional["Normalizer"] = None
 
 def _get_normalizer() -> Optional["Normalizer"]:
@@ -41,27 +59,41 @@ def _get_normalizer() -> Optional["Normalizer"]:
 
 def is_persian_text(text: str) -> bool:
     """Heuristically detect if text contains Persian/Arabic script characters."""
-    return bool(_PERSIAN_REGEX.search(text or ""))
-
-def normalize_persian(text: str, *, convert_digits_to_persian: bool = True) -> str:
+    if not text or text.isascii():
+        return False
+    return bool(_PERSIAN_REGEX.search(text))
+
+def normalize_persian(
+    text: str,
+    *,
+    convert_digits_to_persian: bool = True,
+    assume_persian: bool = False,
+) -> str:
     """Normalize Persian text for readability.
 
     - Fix Arabic vs Persian letters (ك→ک, ي→ی)
     - Unify whitespace and punctuation spacing
     - Remove tatweel/diacritics
     - Optionally convert digits to Persian
+
+    Text without any Persian/Arabic characters (and without digits to convert)
+    is returned unchanged. Pass ``assume_persian=True`` when the caller has
+    already run ``is_persian_text`` to skip the detection scan.
     """
     if not text:
         return text
 
-    # Map Arabic forms to Persian equivalents
-    text = (
-        text.replace("\u064A", "\u06CC")  # ي -> ی
-            .replace("\u0643", "\u06A9")  # ك -> ک
-            .replace("\u06C0", "\u0629")  # ۀ -> ة (rare; keep as-is if needed)
-    )
+    # Fast path: nothing to normalize in non-Persian text (e.g. English output)
+    if not assume_persian and not is_persian_text(text):
+        if not convert_digits_to_persian or not any(ch.isdigit() for ch in text):
+            return text
+
+    # Map Arabic forms to Persian, strip tatweel and optionally convert digits in one pass
+    text = text.translate(_PERSIAN_MULTI if convert_digits_to_persian else _PERSIAN_LETTERS)
 
-    # Hazm normalization (if available)
+    # Hazm normalization (if available). Always run: besides spacing it fixes
+    # affixes (می‌کند, ‌ها), ى, Arabic-Indic digits and quotes, so there is no
+    # cheap check that text is "already normalized".
     norm = _get_normalizer()
     if norm is not None:
         try:
@@ -70,18 +102,11 @@ def normalize_persian(text: str, *, convert_digits_to_persian: bool = True) -> s
             pass
 
     # Punctuation spacing fixes around ، ؛ ؟ ! .
-    text = re.sub(r"\s*([,،؛\!\?\.:])\s*", r"\1 ", text)
-    text = re.sub(r"\s+", " ", text).strip()
-
-    # Optional digit conversion
-    if convert_digits_to_persian and digits is not None:
-        try:
-            text = digits.en_to_fa(text)
-        except Exception:
-            pass
+    text = _PUNCT_WS_RE.sub(lambda m: (m.group(1) + " ") if m.group(1) else " ", text).strip()
 
     return text
 
+@lru_cache(maxsize=128)
 def shape_bidi_display(text: str) -> str:
     """Return a visually-correct RTL display string using Arabic reshaping + bidi.
 
@@ -91,9 +116,9 @@ def shape_bidi_display(text: str) -> str:
     if not text:
         return text
     # Reshape for proper glyph joining
-    if arabic_reshaper is not None:
+    if _RESHAPER is not None:
         try:
-            reshaped = arabic_reshaper.reshape(text)
+            reshaped = _RESHAPER.reshape(text)
         except Exception:
             reshaped = text
     else:
@@ -104,3 +129,7 @@ def shape_bidi_display(text: str) -> str:
     except Exception:
         visual = reshaped
     return visual
+
+def clear_display_cache() -> None:
+    """Drop cached shaped/bidi display strings."""
+    shape_bidi_display.cache_clear()
@@ -1,46 +1,46 @@
+import gc
+import glob
 import os
-import sys
-import whisper
+import re
 import threading
 import time
+from collections import OrderedDict
+from functools import lru_cache
 from pathlib import Path
 from typing import Optional
 
 # Persian text utilities
 try:
-    from text_utils import normalize_persian, is_persian_text, shape_bidi_display
+    from text_utils import normalize_persian, is_persian_text, shape_bidi_display, clear_display_cache
 except Exception:
     # Fallbacks if utilities are unavailable
-    def normalize_persian(text: str, *, convert_digits_to_persian: bool = True) -> str:  # type: ignore
+    def normalize_persian(text: str, *, convert_digits_to_persian: bool = True, assume_persian: bool = False) -> str:  # type: ignore
         return text
     def is_persian_text(text: str) -> bool:  # type: ignore
         return False
     def shape_bidi_display(text: str) -> str:  # type: ignore
         return text
+    def clear_display_cache() -> None:  # type: ignore
+        pass
 
 # Fix tkinter environment variables before importing
 def fix_tkinter_env():
     """Set correct TCL/TK environment variables"""
-    python_dir = os.path.dirname(sys.executable)
+    # Nothing to do if they are already set
+    if os.environ.get('TCL_LIBRARY') and os.environ.get('TK_LIBRARY'):
+        return
     
-    # Check for system Python TCL/TK
-    system_tcl_paths = [
-        r"C:\Python313\tcl\tcl8.6",
-        r"C:\Python312\tcl\tcl8.6", 
-        r"C:\Python311\tcl\tcl8.6",
-        r"C:\Python310\tcl\tcl8.6",
-    ]
+    # Check for system Python TCL/TK, newest Python first
+    def python_version(path):
+        match = re.search(r"Python3(\d+)", path)
+        return int(match.group(1)) if match else 0
     
-    system_tk_paths = [
-        r"C:\Python313\tcl\tk8.6",
-        r"C:\Python312\tcl\tk8.6",
-        r"C:\Python311\tcl\tk8.6", 
-        r"C:\Python310\tcl\tk8.6",
-    ]
+    system_tcl_paths = sorted(glob.glob(r"C:\Python3*\tcl\tcl8.6"), key=python_version, reverse=True)
     
     # Find working TCL/TK
-    for tcl_path, tk_path in zip(system_tcl_paths, system_tk_paths):
-        if os.path.exists(tcl_path) and os.path.exists(tk_path):
+    for tcl_path in system_tcl_paths:
+        tk_path = tcl_path.replace('tcl8.6', 'tk8.6')
+        if os.path.exists(tk_path):
             os.environ['TCL_LIBRARY'] = tcl_path
             os.environ['TK_LIBRARY'] = tk_path
             break
@@ -56,13 +56,186 @@ except Exception as e:
     print(f"❌ tkinter error: {e}")
     TKINTER_AVAILABLE = False
 
-# Try to import librosa for audio loading
-try:
-    import librosa
+# Loaded Whisper models kept in memory at once (large alone is several GB)
+MODEL_CACHE_SIZE = 2
+
+# whisper.transcribe's defaults for temperature fallback and silence skipping
+WHISPER_TEMPERATURES = (0.0, 0.2, 0.4, 0.6, 0.8, 1.0)
+WHISPER_COMPRESSION_RATIO_THRESHOLD = 2.4
+WHISPER_LOGPROB_THRESHOLD = -1.0
+WHISPER_NO_SPEECH_THRESHOLD = 0.6
+
+# Heavy ML modules are imported on first use to keep GUI startup fast
+@lru_cache(maxsize=None)
+def _torch():
+    import torch
+    # Let CPU transcription use every available core
+    torch.set_num_threads(os.cpu_count() or 1)
+    return torch
+
+@lru_cache(maxsize=None)
+def _whisper():
+    import whisper
+    return whisper
+
+@lru_cache(maxsize=None)
+def _faster_whisper():
+    """faster-whisper (CTranslate2) backend, or None when it is not installed"""
+    try:
+        import faster_whisper
+    except ImportError:
+        return None
+    return faster_whisper
+
+def _is_faster_whisper_model(model) -> bool:
+    fw = _faster_whisper()
+    return fw is not None and isinstance(model, fw.WhisperModel)
+
+def _load_audio_sf(path: str):
+    """Decode an audio file to 16 kHz mono float32 with soundfile (no ffmpeg)"""
     import soundfile as sf
-    LIBROSA_AVAILABLE = True
-except ImportError:
-    LIBROSA_AVAILABLE = False
+    from scipy.signal import resample_poly
+    data, sr = sf.read(path, dtype='float32', always_2d=False)
+    if data.ndim == 2:
+        data = data.mean(axis=1)  # downmix to mono
+    if sr != 16000:
+        data = resample_poly(data, 16000, sr)
+    return data.astype('float32', copy=False)
+
+def _iter_whisper_segments(model, audio):
+    """Transcribe audio, yielding (segment_text, language) as soon as each segment
+    is decoded instead of after the whole file"""
+    if _is_faster_whisper_model(model):
+        # faster-whisper already decodes lazily, segment by segment
+        segments, info = model.transcribe(audio, language=None, task="transcribe")
+        for segment in segments:
+            yield segment.text, info.language
+        return
+    
+    # openai-whisper has no segment iterator: decode window by window ourselves
+    yield from _iter_openai_whisper_segments(model, audio)
+
+def _iter_openai_whisper_segments(model, audio):
+    """Decode one 30 s mel window at a time, seeking on the last timestamp token
+    like whisper.transcribe, and yield (segment_text, language) per window"""
+    whisper = _whisper()
+    torch = _torch()
+    from whisper.audio import N_FRAMES, N_SAMPLES
+    from whisper.tokenizer import get_tokenizer
+    
+    fp16 = model.device.type == "cuda"
+    dtype = torch.float16 if fp16 else torch.float32
+    mel = whisper.log_mel_spectrogram(audio, model.dims.n_mels, padding=N_SAMPLES)
+    content_frames = mel.shape[-1] - N_FRAMES
+    input_stride = N_FRAMES // model.dims.n_audio_ctx  # mel frames per timestamp step
+    
+    def window(seek, size=N_FRAMES):
+        # Only real content frames; pad_or_trim fills the rest with zero mel frames
+        return whisper.pad_or_trim(mel[:, seek:seek + size], N_FRAMES).to(model.device).to(dtype)
+    
+    # Detect the language once, on the first window
+    language = "en"
+    if model.is_multilingual:
+        with torch.inference_mode():
+            _, probs = model.detect_language(window(0))
+        language = max(probs, key=probs.get)
+    tokenizer = get_tokenizer(
+        model.is_multilingual, num_languages=model.num_languages, language=language, task="transcribe"
+    )
+    
+    def decode_with_fallback(mel_segment, prompt):
+        # Retry at higher temperatures when the output looks repetitive or unlikely
+        for temperature in WHISPER_TEMPERATURES:
+            options = whisper.DecodingOptions(
+                task="transcribe", language=language, temperature=temperature, prompt=prompt, fp16=fp16
+            )
+            with torch.inference_mode():
+                result = whisper.decode(model, mel_segment, options)
+            if (result.no_speech_prob > WHISPER_NO_SPEECH_THRESHOLD
+                    and result.avg_logprob < WHISPER_LOGPROB_THRESHOLD):
+                break  # silence; a retry won't help
+            if (result.compression_ratio <= WHISPER_COMPRESSION_RATIO_THRESHOLD
+                    and result.avg_logprob >= WHISPER_LOGPROB_THRESHOLD):
+                break
+        return result
+    
+    all_tokens = []
+    prompt_reset_since = 0
+    seek = 0
+    while seek < content_frames:
+        segment_size = min(N_FRAMES, content_frames - seek)
+        result = decode_with_fallback(window(seek, segment_size), all_tokens[prompt_reset_since:])
+        tokens = result.tokens
+        
+        # Skip silent windows
+        if result.no_speech_prob > WHISPER_NO_SPEECH_THRESHOLD and result.avg_logprob <= WHISPER_LOGPROB_THRESHOLD:
+            seek += segment_size
+            continue
+        
+        # Segments are delimited by pairs of consecutive timestamp tokens
+        is_timestamp = [t >= tokenizer.timestamp_begin for t in tokens]
+        slices = [i + 1 for i in range(len(tokens) - 1) if is_timestamp[i] and is_timestamp[i + 1]]
+        single_timestamp_ending = is_timestamp[-2:] == [False, True]
+        if slices:
+            if single_timestamp_ending:
+                slices.append(len(tokens))
+            pieces = [tokens[a:b] for a, b in zip([0] + slices, slices)]
+            if single_timestamp_ending:
+                seek += segment_size
+            else:
+                # The last segment runs past the window: resume at its start timestamp
+                seek += (tokens[slices[-1] - 1] - tokenizer.timestamp_begin) * input_stride
+        else:
+            pieces = [tokens]
+            seek += segment_size
+        
+        for piece in pieces:
+            text = tokenizer.decode([t for t in piece if t < tokenizer.eot])
+            if text.strip():
+                yield text, language
+        all_tokens.extend(t for piece in pieces for t in piece)
+        if result.temperature > 0.5:
+            # Don't condition later windows on a likely-garbled high-temperature decode
+            prompt_reset_since = len(all_tokens)
+
+def _prepare_display(text: str, language: str = ""):
+    """Return (logical, visual, rtl) for a transcript; CPU-heavy, so run it off the Tk thread"""
+    # Decide if text is Persian
+    maybe_persian = is_persian_text(text) or str(language).lower() in {"fa", "fas", "fa-ir", "persian"}
+    if maybe_persian:
+        logical = normalize_persian(text, assume_persian=True)
+        return logical, shape_bidi_display(logical), True
+    return text, text, False
+
+def _load_whisper_model(model_size: str):
+    """Load a Whisper model, on the GPU when CUDA is available.
+
+    Prefers faster-whisper (FP16 on GPU, INT8 on CPU), stepping down to the GPU's
+    default precision and then the CPU if a configuration fails to load, and falls
+    back to openai-whisper (FP16 decoding on GPU) if none does.
+    """
+    fw = _faster_whisper()
+    fw_error = None
+    if fw is not None:
+        import ctranslate2
+        attempts = [("cpu", "int8")]
+        if ctranslate2.get_cuda_device_count() > 0:
+            # float16 is unsupported on some GPUs; missing cuDNN/cuBLAS also fails here
+            attempts[:0] = [("cuda", "float16"), ("cuda", "default")]
+        for device, compute_type in attempts:
+            try:
+                return fw.WhisperModel(model_size, device=device, compute_type=compute_type)
+            except Exception as e:
+                fw_error = e
+    # openai-whisper keeps fp32 weights; FP16 comes from transcribe's fp16 option
+    try:
+        whisper = _whisper()
+    except ImportError:
+        if fw_error is not None:
+            raise fw_error  # openai-whisper isn't installed; report the real failure
+        raise
+    device = "cuda" if _torch().cuda.is_available() else "cpu"
+    return whisper.load_model(model_size, device=device)
 
 class SimpleVoiceToTextGUI:
     def __init__(self, root):
@@ -73,12 +246,16 @@ class SimpleVoiceToTextGUI:
         
         # Initialize variables
         self.model = None
-        self.model_cache = {}
+        self.model_cache = OrderedDict()  # LRU of loaded models, see _cache_model
         self.current_model_size: Optional[str] = None
         self.loader_win: Optional[tk.Toplevel] = None
         self.selected_file = None
         self.is_processing = False
         self._last_logical_text: Optional[str] = None  # for proper copy/save
+        self._last_visual: Optional[str] = None  # what the text widget currently shows
+        self._last_tag = ()
+        self._pending_status = ""
+        self._status_flush_scheduled = False
         
         # Create GUI
         self.create_widgets()
@@ -332,10 +509,11 @@ class SimpleVoiceToTextGUI:
             self.root.after(0, lambda: self._show_loader(f"Loading Whisper {model_size} model..."))
             # Use cache if already loaded
             if model_size in self.model_cache:
+                self.model_cache.move_to_end(model_size)
                 self.model = self.model_cache[model_size]
             else:
-                mdl = whisper.load_model(model_size)
-                self.model_cache[model_size] = mdl
+                mdl = _load_whisper_model(model_size)
+                self._cache_model(model_size, mdl)
                 self.model = mdl
             self.root.after(0, lambda: self.update_status(f"Model {model_size} ready"))
         except Exception as e:
@@ -343,6 +521,19 @@ class SimpleVoiceToTextGUI:
         finally:
             self.root.after(0, self._hide_loader)
     
+    def _cache_model(self, model_size: str, mdl):
+        """Remember a loaded model, evicting the least recently used beyond the cap"""
+        self.model_cache[model_size] = mdl
+        self.model_cache.move_to_end(model_size)
+        if len(self.model_cache) > MODEL_CACHE_SIZE:
+            _, old_mdl = self.model_cache.popitem(last=False)
+            uses_torch = not _is_faster_whisper_model(old_mdl)
+            del old_mdl
+            gc.collect()
+            # Only openai-whisper models live in torch's CUDA allocator cache
+            if uses_torch and _torch().cuda.is_available():
+                _torch().cuda.empty_cache()  # hand freed VRAM back to the driver
+    
     def select_file(self):
         """Open file dialog to select audio file"""
         filetypes = [
@@ -368,14 +559,15 @@ class SimpleVoiceToTextGUI:
         """Load Whisper model"""
         # Prefer cached model
         if model_size in self.model_cache:
+            self.model_cache.move_to_end(model_size)
             self.model = self.model_cache[model_size]
             return True
         if self.model is None:
             try:
                 # Show loader during load
                 self.root.after(0, lambda: self._show_loader(f"Loading Whisper {model_size} model..."))
-                mdl = whisper.load_model(model_size)
-                self.model_cache[model_size] = mdl
+                mdl = _load_whisper_model(model_size)
+                self._cache_model(model_size, mdl)
                 self.model = mdl
                 self.root.after(0, lambda: self.update_status(f"Model {model_size} loaded successfully"))
                 return True
@@ -414,41 +606,39 @@ class SimpleVoiceToTextGUI:
             # Update status
             self.root.after(0, lambda: self.update_status("Transcribing audio..."))
             
-            # Try transcription
-            result = None
+            # Decode once up front and hand Whisper the samples directly
             try:
-                # Direct Whisper transcription
-                result = self.model.transcribe(
-                    self.selected_file,
-                    language=None,  # Auto-detect
-                    task="transcribe",
-                    verbose=False
-                )
+                audio = _load_audio_sf(self.selected_file)
             except Exception as e:
-                # Try with librosa if available
-                if LIBROSA_AVAILABLE:
-                    self.root.after(0, lambda: self.update_status("Trying alternative audio loading..."))
-                    try:
-                        audio, sr = librosa.load(self.selected_file, sr=16000)
-                        result = self.model.transcribe(
-                            audio,
-                            language=None,
-                            task="transcribe",
-                            verbose=False
-                        )
-                    except Exception as e2:
-                        raise Exception(f"Both methods failed: {str(e)}, {str(e2)}")
-                else:
-                    raise e
+                # soundfile missing or format unsupported by libsndfile (m4a, aac, wma...):
+                # fall back to the backend's own decoder
+                try:
+                    if _is_faster_whisper_model(self.model):
+                        audio = _faster_whisper().decode_audio(self.selected_file)
+                    else:
+                        audio = _whisper().load_audio(self.selected_file)
+                except Exception as e2:
+                    raise Exception(f"Both methods failed: {str(e)}, {str(e2)}") from e2
             
-            if result:
-                transcribed_text = result["text"].strip()
-                detected_language = result.get("language", "unknown")
-                
-                # Update GUI with result
-                self.root.after(0, lambda: self._display_result(transcribed_text, detected_language))
-            else:
-                raise Exception("No result from transcription")
+            # Stream segments into the text area as each window is decoded
+            self.root.after(0, self._begin_stream)
+            segments = []
+            detected_language = "unknown"
+            for segment, language in _iter_whisper_segments(self.model, audio):
+                detected_language = language or detected_language
+                if not segments:
+                    segment = segment.lstrip()
+                    if not segment:
+                        continue
+                segments.append(segment)
+                # Normalize/shape here so the Tk thread only inserts
+                _, visual, rtl = _prepare_display(segment)
+                self.root.after(0, lambda t=segment, v=visual, r=rtl: self._append_segment(t, v, r))
+            transcribed_text = "".join(segments).strip()
+            
+            # Update GUI with the complete result, prepared off the Tk thread
+            logical, visual, rtl = _prepare_display(transcribed_text, detected_language)
+            self.root.after(0, lambda: self._display_result_prepared(logical, visual, detected_language, rtl))
             
         except Exception as e:
             error_msg = f"Error during transcription: {str(e)}"
@@ -470,24 +660,52 @@ class SimpleVoiceToTextGUI:
         self.select_button.config(state='normal')
         self.progress.stop()
     
-    def _display_result(self, text, language):
-        """Display transcription result"""
-        # Decide if text is Persian
-        maybe_persian = is_persian_text(text) or str(language).lower() in {"fa", "fas", "fa-ir", "persian"}
-        if maybe_persian:
-            logical = normalize_persian(text)
-            visual = shape_bidi_display(logical)
-            self._last_logical_text = logical
-        else:
-            visual = text
-            self._last_logical_text = text
-
+    def _begin_stream(self):
+        """Clear the text area before streamed segments arrive"""
         self.text_output.delete(1.0, tk.END)
-        if maybe_persian:
-            # Insert visually-shaped RTL text and apply right alignment
-            self.text_output.insert(1.0, visual, 'rtl')
+        self.text_output.edit_modified(False)
+        self._last_visual = ""
+        self._last_tag = ()
+        self._last_logical_text = ""
+    
+    def _append_segment(self, text, visual, rtl):
+        """Show one transcribed segment (already shaped) as soon as it is decoded"""
+        if self.text_output.edit_modified():
+            # The user edited the text while streaming: the widget no longer
+            # matches what we inserted, so the final result must be fully redrawn
+            self._last_visual = None
+        self._last_logical_text += text
+        if rtl:
+            # Shaped line by line while streaming; the full result is redrawn at the end
+            self.text_output.insert(tk.END, visual + "\n", 'rtl')
+            self._last_visual = None
         else:
-            self.text_output.insert(1.0, visual)
+            # Same text the final result will show, so that redraw is a no-op
+            self.text_output.insert(tk.END, visual)
+            if self._last_visual is not None:
+                self._last_visual += visual
+        self.text_output.edit_modified(False)
+        self.text_output.see(tk.END)
+    
+    def _display_result_prepared(self, logical, visual, language, rtl):
+        """Display a transcription result already normalized/shaped by the worker"""
+        self._last_logical_text = logical
+        
+        # Insert visually-shaped RTL text with right alignment for Persian
+        tag = 'rtl' if rtl else ()
+        # Only replace the tail that differs from the previous result, unless the
+        # user has edited the text since it was displayed
+        if self._last_visual is not None and self._last_tag == tag and not self.text_output.edit_modified():
+            keep = len(os.path.commonprefix([self._last_visual, visual]))
+        else:
+            keep = 0
+        # Tk counts indices in Tcl characters (UTF-16 units on Tcl 8.6), not code points
+        keep_index = self.text_output.tk.call('string', 'length', visual[:keep]) if keep else 0
+        self.text_output.delete(f"1.0 + {keep_index}c", tk.END)
+        self.text_output.insert(tk.END, visual[keep:], tag)
+        self.text_output.edit_modified(False)
+        self._last_visual = visual
+        self._last_tag = tag
         self.copy_button.config(state='normal')
         self.save_button.config(state='normal')
         self.update_status(f"✅ Transcription completed! Language: {language}")
@@ -533,14 +751,22 @@ class SimpleVoiceToTextGUI:
     def clear_text(self):
         """Clear the text output"""
         self.text_output.delete(1.0, tk.END)
+        self._last_visual = None
+        clear_display_cache()
         self.copy_button.config(state='disabled')
         self.save_button.config(state='disabled')
         self.update_status("Text cleared")
     
     def update_status(self, message):
-        """Update status label"""
-        self.status_label.config(text=message)
-        self.root.update_idletasks()
+        """Update status label (coalesced into one repaint at the next idle)"""
+        self._pending_status = message
+        if not self._status_flush_scheduled:
+            self._status_flush_scheduled = True
+            self.root.after_idle(self._flush_status)
+    
+    def _flush_status(self):
+        self._status_flush_scheduled = False
+        self.status_label.config(text=self._pending_status)
 
 def main():
     if not TKINTER_AVAILABLE: